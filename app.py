@@ -1,29 +1,21 @@
 # app.py
-import os
 import io
+import wave
+from importlib.util import find_spec
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
 import streamlit as st
-from functools import lru_cache
-import pandas as pd
+from math import gcd
+import numpy as np
 
-# Voice
-try:
-    import whisper  # openai-whisper
-except Exception:
-    whisper = None
-
-from gtts import gTTS
-from pydub import AudioSegment
-
-# Optional mic component
-try:
-    from streamlit_mic_recorder import mic_recorder
-except Exception:
-    mic_recorder = None
+# Voice libraries (faster-whisper, gTTS, piper, pydub, soundfile, scipy) are
+# imported inside the functions that use them, so the text tab renders
+# without paying for torch/CTranslate2/ffmpeg imports.
 
 # LangChain retrieval
+from app.services.facets import get_facets
 from app.services.retrieval import search_hospitals
 
 
@@ -31,43 +23,130 @@ def check_ffmpeg() -> bool:
     import shutil
     return shutil.which("ffmpeg") is not None
 
+def _whisper_device() -> tuple:
+    """
+    Pick (device, compute_type) for CTranslate2.
+    INT8 weights with FP16 activations on GPU; plain INT8 on CPU.
+    """
+    try:
+        import ctranslate2  # installed with faster-whisper; no torch needed
+        if ctranslate2.get_cuda_device_count() > 0:
+            return "cuda", "int8_float16"
+    except Exception:
+        pass
+    return "cpu", "int8"
+
+WHISPER_MODELS = ["tiny.en", "base.en", "base", "small"]  # .en = English-only, faster
+# The model is shared by every session (st.cache_resource). CTranslate2 runs up
+# to this many transcribe() calls from different threads in parallel.
+WHISPER_WORKERS = 2
+
 @st.cache_resource
-def load_whisper(model_name: str = "base"):
-    if whisper is None:
-        return None, "Whisper not installed. Install with: pip install openai-whisper"
+def load_whisper(model_name: str = "base.en"):
     try:
-        model = whisper.load_model(model_name)
+        from faster_whisper import WhisperModel  # CTranslate2 backend
+    except Exception:
+        return None, "Whisper not installed. Install with: pip install faster-whisper"
+    try:
+        device, compute_type = _whisper_device()
+        model = WhisperModel(model_name, device=device, compute_type=compute_type,
+                             num_workers=WHISPER_WORKERS)
         return model, None
     except Exception as e:
         return None, f"Failed to load Whisper model: {e}"
 
-def stt_from_bytes(model, audio_bytes: bytes, lang_hint: Optional[str] = None) -> str:
+SAMPLE_RATE = 16000  # Whisper expects 16 kHz mono float32
+
+def _decode_wav(audio_bytes: bytes) -> np.ndarray:
+    """
+    Decode WAV bytes in memory to 16 kHz mono float32 (no ffmpeg).
+    """
+    import soundfile as sf
+
+    data, sr = sf.read(io.BytesIO(audio_bytes), dtype="float32", always_2d=True)
+    data = data.mean(axis=1)
+    if sr != SAMPLE_RATE:
+        from scipy.signal import resample_poly
+        g = gcd(sr, SAMPLE_RATE)
+        data = resample_poly(data, SAMPLE_RATE // g, sr // g).astype(np.float32)
+    return data
+
+def _is_wav(audio_bytes: bytes) -> bool:
+    return audio_bytes[:4] == b"RIFF"
+
+def _load_audio(audio_bytes: bytes) -> np.ndarray:
+    """
+    Fast path for RIFF/WAV (the mic recorder is asked for WAV, and uploads may
+    be WAV); pydub/ffmpeg only for compressed containers (mp3/ogg/webm).
+    """
+    if _is_wav(audio_bytes):
+        try:
+            return _decode_wav(audio_bytes)
+        except Exception:
+            pass  # unusual WAV codec -> let ffmpeg handle it
+    from pydub import AudioSegment
+
     audio = AudioSegment.from_file(io.BytesIO(audio_bytes))
-    audio = audio.set_channels(1).set_frame_rate(16000)
-    buf = io.BytesIO()
-    audio.export(buf, format="wav")
-    buf.seek(0)
-
-    tmp_path = Path("tmp_query.wav")
-    with open(tmp_path, "wb") as f:
-        f.write(buf.read())
-
-    options = {}
-    if lang_hint:
-        options["language"] = lang_hint
-    result = model.transcribe(str(tmp_path), **options)
+    audio = audio.set_channels(1).set_frame_rate(SAMPLE_RATE)
+    # PCM ints -> float32 in [-1, 1]; no WAV re-encode or temp file
+    scale = float(1 << (8 * audio.sample_width - 1))
+    return np.array(audio.get_array_of_samples()).astype(np.float32) / scale
+
+# Silero VAD (bundled with faster-whisper) drops non-speech before the encoder,
+# so start/stop lag from the mic doesn't cost 30 s padded windows.
+VAD_PARAMETERS = {"min_silence_duration_ms": 300, "speech_pad_ms": 200}
+
+def stt_from_bytes(model, audio_bytes: bytes, lang_hint: Optional[str] = None) -> str:
+    samples = _load_audio(audio_bytes)
+    segments, _info = model.transcribe(samples, language=lang_hint, beam_size=1,
+                                       vad_filter=True, vad_parameters=VAD_PARAMETERS)
+    text = "".join(s.text for s in segments)  # generator: decoding happens here
+    return text.strip()
+
+VOICES_DIR = Path("voices")  # piper models: voices/<lang>.onnx (+ .onnx.json)
+
+@st.cache_resource
+def _piper(lang: str):
     try:
-        tmp_path.unlink(missing_ok=True)
+        from piper.voice import PiperVoice  # optional on-device TTS
     except Exception:
-        pass
-    return (result or {}).get("text", "").strip()
+        return None
+    model_path = VOICES_DIR / f"{lang}.onnx"
+    if not model_path.exists():
+        return None
+    try:
+        return PiperVoice.load(str(model_path))
+    except Exception:
+        return None  # corrupt/mismatched voice -> gTTS
 
-def tts_to_bytes(text: str, lang: str = "en") -> bytes:
-    tts = gTTS(text=text, lang=lang)
+def tts_to_bytes(text: str, lang: str = "en", voice=None) -> Tuple[bytes, str]:
+    """
+    Returns (audio bytes, mime type). Uses `voice` (a piper voice, see _piper)
+    when given (no network call), otherwise gTTS. Callers resolve the voice on
+    the script thread so this can run in a worker thread.
+    """
     out = io.BytesIO()
+    if voice is not None:
+        with wave.open(out, "wb") as wav_file:
+            if hasattr(voice, "synthesize_wav"):  # piper-tts >= 1.3
+                voice.synthesize_wav(text, wav_file)
+            else:
+                voice.synthesize(text, wav_file)
+        return out.getvalue(), "audio/wav"
+
+    from gtts import gTTS
+
+    tts = gTTS(text=text, lang=lang)
     tts.write_to_fp(out)
-    out.seek(0)
-    return out.read()
+    return out.getvalue(), "audio/mp3"
+
+def _mic_recorder():
+    # Optional mic component
+    try:
+        from streamlit_mic_recorder import mic_recorder
+        return mic_recorder
+    except Exception:
+        return None
 
 def result_card(r: Dict[str, Any]):
     st.markdown(f"**{r.get('hospital_name','(unknown)')}** — {r.get('city','')}  "
@@ -85,56 +164,29 @@ def result_card(r: Dict[str, Any]):
         st.write(r.get("snippet", ""))
     st.divider()
 
-@lru_cache(maxsize=1)
-def _facet_values() -> dict:
-    """
-    Read data/hospitals.csv (normalized) to build dropdown choices.
-    """
-    try:
-        df = pd.read_csv("data/hospitals.csv")
-    except Exception:
-        return {"cities": [], "specialties": [], "insurers": []}
-
-    def split_pipe(col):
-        vals = set()
-        series = df.get(col)
-        if series is None:
-            return []
-        for s in series.fillna(""):
-            for p in str(s).split("|"):
-                p = p.strip()
-                if p:
-                    vals.add(p)
-        return sorted(vals)
-
-    cities_series = df.get("city")
-    cities = sorted(set(cities_series.dropna().astype(str).str.strip())) if cities_series is not None else []
-
-    specialties = split_pipe("specialties")
-    insurers = split_pipe("insurers")
-    return {"cities": cities, "specialties": specialties, "insurers": insurers}
-
 def main():
     st.set_page_config(page_title="Hospital Voice Nearby — LangChain", page_icon="🩺", layout="wide")
     st.title("🩺 Hospital Voice Nearby — LangChain + Voice")
 
     ok_ffmpeg = check_ffmpeg()
-    model, werr = load_whisper("base")
 
     with st.sidebar:
         st.header("Prerequisites")
         st.write(f"FFmpeg: {'✅' if ok_ffmpeg else '❌'}")
         if not ok_ffmpeg:
             st.caption("Install ffmpeg and add C:\\ffmpeg\\bin to PATH, then restart your terminal.")
-        st.write(f"Whisper: {'✅' if (model and not werr) else '❌'}")
-        if werr:
-            st.caption(werr)
+        model_size = st.selectbox("Whisper model", WHISPER_MODELS, index=1,
+                                  help="English-only (.en) models are faster; use base/small for Hindi/Arabic/German.")
+        has_whisper = find_spec("faster_whisper") is not None  # no import; model loads on first use
+        st.write(f"Whisper: {'✅' if has_whisper else '❌'}")
+        if not has_whisper:
+            st.caption("Whisper not installed. Install with: pip install faster-whisper")
 
         st.header("Filters")
-        facets = _facet_values()
-        city = st.selectbox("City", options=["All"] + facets["cities"], index=0)
-        specialty = st.selectbox("Specialty", options=["All"] + facets["specialties"], index=0)
-        insurer = st.selectbox("Insurer", options=["All"] + facets["insurers"], index=0)
+        facets = get_facets()
+        city = st.selectbox("City", options=["All", *facets["cities"]], index=0)
+        specialty = st.selectbox("Specialty", options=["All", *facets["specialties"]], index=0)
+        insurer = st.selectbox("Insurer", options=["All", *facets["insurers"]], index=0)
 
         st.header("Retriever Settings")
         k = st.slider("Top-K results", 1, 20, value=5)
@@ -152,7 +204,11 @@ def main():
             if not q.strip():
                 st.warning("Enter a query.")
             else:
-                rows = search_hospitals(q.strip(), k=k, city=city, specialty=specialty, insurer=insurer)
+                try:
+                    rows = search_hospitals(q.strip(), k=k, city=city, specialty=specialty, insurer=insurer)
+                except RuntimeError as e:
+                    st.error(str(e))
+                    return
                 if not rows:
                     st.info("No results found.")
                 for r in rows:
@@ -165,12 +221,15 @@ def main():
         audio_bytes = None
 
         with col1:
+            mic_recorder = _mic_recorder()
             if mic_recorder is not None:
                 st.caption("Mic recorder (in-browser):")
-                rec = mic_recorder(start_prompt="🎙️ Start recording", stop_prompt="⏹ Stop", key="mic1")
+                # WAV output takes the in-memory decode path (no ffmpeg)
+                rec = mic_recorder(start_prompt="🎙️ Start recording", stop_prompt="⏹ Stop",
+                                   format="wav", key="mic1")
                 if rec and "bytes" in rec:
                     audio_bytes = rec["bytes"]
-                    st.audio(audio_bytes, format="audio/webm")
+                    st.audio(audio_bytes, format="audio/wav")
             else:
                 st.info("Optional component 'streamlit-mic-recorder' not installed. Use file upload instead.")
 
@@ -183,28 +242,46 @@ def main():
         if st.button("Transcribe & Search", key="voice_search"):
             if audio_bytes is None:
                 st.warning("Record or upload audio first.")
-            elif not ok_ffmpeg or model is None:
+            elif not has_whisper or (not ok_ffmpeg and not _is_wav(audio_bytes)):
+                # ffmpeg is only needed to decode compressed formats
                 st.error("Missing FFmpeg or Whisper. See sidebar.")
             else:
+                # English-only models force language="en"; use the multilingual one instead
+                stt_model = model_size
+                if lang_hint not in ("", "en") and stt_model.endswith(".en"):
+                    stt_model = stt_model.removesuffix(".en")  # same size, multilingual
+                    st.info(f"'{model_size}' is English-only; using '{stt_model}' for language '{lang_hint}'.")
+                with st.spinner("Loading Whisper model..."):
+                    model, werr = load_whisper(stt_model)
+                if werr:
+                    st.error(werr)
+                    return
                 with st.spinner("Transcribing..."):
                     query_text = stt_from_bytes(model, audio_bytes, lang_hint if lang_hint else None)
                 if not query_text:
                     st.warning("No speech detected or transcription failed.")
                 else:
                     st.success(f"You said: {query_text!r}")
-                    rows = search_hospitals(query_text, k=k, city=city, specialty=specialty, insurer=insurer)
-                    if not rows:
-                        st.info("No results found.")
-                    for r in rows:
-                        result_card(r)
-
-                    # Optional voice summary
                     try:
-                        summary = f"I found {len(rows)} results for your query."
-                        audio_out = tts_to_bytes(summary, lang=tts_lang)
-                        st.audio(audio_out, format="audio/mp3")
-                    except Exception:
-                        pass
+                        rows = search_hospitals(query_text, k=k, city=city, specialty=specialty, insurer=insurer)
+                    except RuntimeError as e:
+                        st.error(str(e))
+                        return
+
+                    # Optional voice summary: synthesize while the cards render
+                    summary = f"I found {len(rows)} results for your query."
+                    with ThreadPoolExecutor(max_workers=1) as pool:
+                        voice = _piper(tts_lang)  # cache_resource needs the script thread
+                        tts_future = pool.submit(tts_to_bytes, summary, tts_lang, voice)
+                        if not rows:
+                            st.info("No results found.")
+                        for r in rows:
+                            result_card(r)
+                        try:
+                            audio_out, audio_format = tts_future.result()
+                            st.audio(audio_out, format=audio_format)
+                        except Exception:
+                            pass
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,53 @@
+# app/services/bm25.py
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.documents import Document
+from rank_bm25 import BM25Okapi
+
+from app.services.lc_vector import PERSIST_DIR, load_vectorstore
+
+_TOKEN_RE = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+class SparseIndex:
+    """
+    In-memory BM25 over the documents already stored in Chroma.
+    Keeps the corpus aligned with the dense index without a second ingest step.
+    """
+    def __init__(self, documents: List[Document]):
+        self.documents = documents
+        self.bm25 = BM25Okapi([tokenize(d.page_content) for d in documents]) if documents else None
+
+    def search(self, query: str, k: int = 5,
+               predicate: Optional[Callable[[Dict], bool]] = None) -> List[Document]:
+        tokens = tokenize(query)
+        if self.bm25 is None or not tokens:
+            return []
+        scores = self.bm25.get_scores(tokens)
+        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+        out: List[Document] = []
+        for i in ranked:
+            if scores[i] <= 0:
+                break
+            doc = self.documents[i]
+            if predicate is None or predicate(doc.metadata or {}):
+                out.append(doc)
+                if len(out) >= k:
+                    break
+        return out
+
+@lru_cache(maxsize=4)
+def get_sparse_index(persist_dir: str = PERSIST_DIR) -> SparseIndex:
+    """
+    Build the BM25 index once per process from the persisted Chroma collection.
+    """
+    data = load_vectorstore(persist_dir).get(include=["documents", "metadatas"])
+    docs = [
+        Document(page_content=text or "", metadata=meta or {})
+        for text, meta in zip(data.get("documents") or [], data.get("metadatas") or [])
+    ]
+    return SparseIndex(docs)
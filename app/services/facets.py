@@ -0,0 +1,74 @@
+# app/services/facets.py
+import os
+from types import MappingProxyType
+from typing import List, Mapping, Tuple
+
+import pandas as pd
+
+HOSPITALS_CSV = "data/hospitals.csv"
+HOSPITALS_PARQUET = "data/hospitals.parquet"  # written by scripts/csv_to_parquet.py
+FACET_COLUMNS = ("city", "specialties", "insurers")
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+def _facet_source() -> Tuple[str, float]:
+    """
+    (path, mtime) of the table to read: the Parquet copy unless the CSV has
+    been edited since it was written.
+    """
+    csv_mtime = _mtime(HOSPITALS_CSV)
+    pq_mtime = _mtime(HOSPITALS_PARQUET)
+    if pq_mtime and pq_mtime >= csv_mtime:
+        return HOSPITALS_PARQUET, pq_mtime
+    return HOSPITALS_CSV, csv_mtime
+
+def _read_facet_frame(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        try:
+            return pd.read_parquet(path, columns=list(FACET_COLUMNS))
+        except Exception:
+            pass  # pyarrow missing or schema mismatch -> CSV
+    return pd.read_csv(HOSPITALS_CSV, usecols=lambda c: c in FACET_COLUMNS, dtype=str)
+
+def load_facets(path: str = HOSPITALS_CSV) -> Mapping[str, Tuple[str, ...]]:
+    """
+    Read the hospitals table (normalized) to build dropdown choices.
+    """
+    try:
+        df = _read_facet_frame(path)
+    except Exception:
+        return MappingProxyType({"cities": (), "specialties": (), "insurers": ()})
+
+    def split_pipe(col) -> List[str]:
+        series = df.get(col)
+        if series is None:
+            return []
+        parts = series.dropna().str.split("|").explode().str.strip()
+        return sorted(parts[parts != ""].unique())
+
+    cities_series = df.get("city")
+    cities = sorted(set(cities_series.dropna().astype(str).str.strip())) if cities_series is not None else []
+
+    return MappingProxyType({
+        "cities": tuple(cities),
+        "specialties": tuple(split_pipe("specialties")),
+        "insurers": tuple(split_pipe("insurers")),
+    })
+
+# Loaded at import and kept per process. Streamlit re-executes app.py on every
+# widget change, but imported modules stay cached, so a rerun costs two stat()
+# calls; the table is only re-read when the CSV/Parquet mtime changes.
+_FACETS_SOURCE = _facet_source()
+FACETS = load_facets(_FACETS_SOURCE[0])
+
+def get_facets() -> Mapping[str, Tuple[str, ...]]:
+    global FACETS, _FACETS_SOURCE
+    source = _facet_source()
+    if source != _FACETS_SOURCE:
+        FACETS = load_facets(source[0])
+        _FACETS_SOURCE = source
+    return FACETS
@@ -1,5 +1,10 @@
 # app/services/lc_vector.py
 import os
+import re
+import sqlite3
+import uuid
+from contextlib import closing
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List
 
@@ -7,47 +12,173 @@ from typing import Any, Dict, List
 os.environ.setdefault("CHROMADB_DISABLE_TELEMETRY", "1")
 os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
 
+import chromadb
+from chromadb.config import Settings
 from langchain_chroma import Chroma  # ✅ new package
+from langchain_core.embeddings import Embeddings
 from langchain_huggingface import HuggingFaceEmbeddings  # ✅ modern embeddings
 
 PERSIST_DIR = Path("storage/chroma").as_posix()
+COLLECTION_NAME = "langchain"  # LangChain's default; matches existing stores
+# Bump when ingest changes the document/metadata layout; the app refuses older stores.
+INDEX_SCHEMA = 2
 EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 MAX_BATCH = 100  # keep < 166 on Chroma 0.5.x
+EMBED_BATCH = 256  # encoder batch size; independent of MAX_BATCH
+QUERY_CACHE_SIZE = 1024
 
+# HNSW index settings, fixed when the collection is first created.
+# Embeddings are unit-normalized, so cosine ranks the same as dot product.
+HNSW_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:M": 32,
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 64,
+}
+
+def _model_kwargs() -> Dict[str, Any]:
+    """
+    SentenceTransformer kwargs: CUDA + FP16 weights when a GPU is present,
+    otherwise CPU FP32 (FP16 matmuls are slow on most CPUs).
+    """
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return {"device": "cuda", "model_kwargs": {"torch_dtype": torch.float16}}
+    except Exception:
+        pass
+    return {"device": "cpu"}
+
+@lru_cache(maxsize=1)
 def get_embeddings():
-    return HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+    """
+    Load MiniLM once per process; every retriever/ingest call reuses it.
+    """
+    return HuggingFaceEmbeddings(
+        model_name=EMBED_MODEL,
+        model_kwargs=_model_kwargs(),
+        encode_kwargs={"normalize_embeddings": True, "batch_size": EMBED_BATCH},
+    )
 
-def normalize_metadata_value(v: Any) -> Any:
-    if isinstance(v, list):
-        return "|".join(map(str, v))
-    if isinstance(v, (str, int, float, bool)) or v is None:
-        return v
-    return str(v)
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings object and memoizes embed_query by text.
+    Repeated text/voice queries skip the MiniLM forward pass.
+    """
+    def __init__(self, base: Embeddings, maxsize: int = QUERY_CACHE_SIZE):
+        self.base = base
+        self._cached = lru_cache(maxsize=maxsize)(self._embed_query)
+
+    def _embed_query(self, text: str) -> tuple:
+        return tuple(self.base.embed_query(text))  # immutable: safe to share
+
+    def embed_query(self, text: str) -> List[float]:
+        return list(self._cached(text))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+@lru_cache(maxsize=1)
+def get_query_embeddings() -> CachedQueryEmbeddings:
+    # One per process so the query cache survives across searches
+    return CachedQueryEmbeddings(get_embeddings())
+
+def tag_key(prefix: str, value: str) -> str:
+    """
+    Metadata key for one facet value, e.g. ("specialty", "Cardiology") -> "specialty_cardiology".
+    Chroma can only filter scalar metadata with equality, so each tag gets its own boolean key.
+    """
+    slug = re.sub(r"[^a-z0-9]+", "_", str(value).strip().lower()).strip("_")
+    return f"{prefix}_{slug}"
 
-def normalize_metadata(meta: Dict[str, Any]) -> Dict[str, Any]:
-    return {k: normalize_metadata_value(v) for k, v in meta.items()}
+def tag_metadata(prefix: str, values: List[str]) -> Dict[str, bool]:
+    return {tag_key(prefix, v): True for v in values if str(v).strip()}
+
+def _enable_wal(persist_dir: str) -> None:
+    """
+    Switch chroma.sqlite3 to WAL so app readers don't block on (or behind) writers.
+    journal_mode is stored in the database file, so this runs once at ingest;
+    it can't be changed inside a transaction, hence a separate sqlite3 handle.
+    """
+    db_path = Path(persist_dir) / "chroma.sqlite3"
+    if not db_path.exists():
+        return
+    try:
+        with closing(sqlite3.connect(db_path)) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+    except sqlite3.Error:
+        pass
+
+@lru_cache(maxsize=4)
+def get_client(persist_dir: str = PERSIST_DIR):
+    """
+    One PersistentClient per directory, shared by ingest and every retriever.
+    """
+    return chromadb.PersistentClient(path=persist_dir, settings=Settings(anonymized_telemetry=False))
 
 def build_vectorstore_from_documents(documents: List, persist_dir: str = PERSIST_DIR) -> Chroma:
     """
-    Create/update a Chroma store and add documents in safe batches.
+    (Re)build the Chroma collection from `documents` and add them in safe batches.
+    The collection is dropped first, so re-running ingest never mixes old and new
+    documents and always recreates the index with HNSW_METADATA.
     Chroma >=0.4 auto-persists; no manual persist() call needed.
     """
     embeddings = get_embeddings()
-    vs = Chroma(embedding_function=embeddings, persist_directory=persist_dir)
+    client = get_client(persist_dir)
+    try:
+        client.delete_collection(COLLECTION_NAME)
+    except Exception:
+        pass  # first ingest: nothing to drop (error type varies across Chroma versions)
+    vs = Chroma(client=client, collection_name=COLLECTION_NAME, embedding_function=embeddings,
+                collection_metadata=HNSW_METADATA)
+
+    # Embed the whole corpus in one encode() call (large batches keep the GPU busy),
+    # then write to Chroma in MAX_BATCH chunks to avoid "Batch size exceeds maximum".
+    texts = [d.page_content for d in documents]
+    metadatas = [{**d.metadata, "index_schema": INDEX_SCHEMA} for d in documents]
+    vectors = embeddings.embed_documents(texts)
+    # Fresh ids are fine: the collection was just dropped, so nothing can duplicate
+    ids = [str(uuid.uuid4()) for _ in documents]
 
-    # Add in batches to avoid "Batch size exceeds maximum" errors
     for i in range(0, len(documents), MAX_BATCH):
-        vs.add_documents(documents[i:i + MAX_BATCH])
+        vs._collection.add(
+            ids=ids[i:i + MAX_BATCH],
+            embeddings=vectors[i:i + MAX_BATCH],
+            documents=texts[i:i + MAX_BATCH],
+            metadatas=metadatas[i:i + MAX_BATCH],
+        )
 
+    _enable_wal(persist_dir)
     # No vs.persist() needed (auto)
     return vs
 
+@lru_cache(maxsize=4)
 def load_vectorstore(persist_dir: str = PERSIST_DIR) -> Chroma:
-    embeddings = get_embeddings()
-    return Chroma(embedding_function=embeddings, persist_directory=persist_dir)
+    """
+    Open the persisted store once per directory and keep it (and its SQLite
+    connection) for the life of the process.
+    """
+    embeddings = get_query_embeddings()
+    # Same HNSW settings as ingest, in case the app creates the collection first
+    vs = Chroma(client=get_client(persist_dir), collection_name=COLLECTION_NAME,
+                embedding_function=embeddings, collection_metadata=HNSW_METADATA)
+    _check_schema(vs, persist_dir)
+    return vs
+
+def _check_schema(vs: Chroma, persist_dir: str) -> None:
+    """
+    Fail loudly on an empty store or one built by an older ingest: filters rely on
+    the per-tag keys, and silently returning nothing looks like "no hospitals".
+    """
+    found = vs._collection.get(where={"index_schema": INDEX_SCHEMA}, limit=1, include=["metadatas"])
+    if not found.get("ids"):
+        raise RuntimeError(
+            f"Vector store at {persist_dir} is empty or was built by an older ingest. "
+            "Rebuild it with: python -m scripts.ingest"
+        )
 
 def get_retriever(k: int = 5, meta_filter: dict | None = None):
-    vs = load_vectorstore()
+    vs = load_vectorstore()  # cached; only the retriever wrapper is rebuilt
     search_kwargs = {"k": k}
     if meta_filter:
         search_kwargs["filter"] = meta_filter  # apply Chroma metadata filter
@@ -1,40 +1,115 @@
 # app/services/retrieval.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
-from app.services.lc_vector import get_retriever
+from app.services.bm25 import get_sparse_index
+from app.services.lc_vector import get_retriever, tag_key
 
-def _run_retriever(retriever, query: str):
-    """
-    LC >= 0.3 retrievers are Runnables -> use .invoke(query).
-    Fallback to .get_relevant_documents for older versions.
-    """
-    try:
-        return retriever.invoke(query)  # modern LC
-    except AttributeError:
-        return retriever.get_relevant_documents(query)  # older LC
+RRF_K = 60  # reciprocal-rank-fusion damping constant
+
+# Long-lived workers for the dense and sparse lookups. Chroma keeps one SQLite
+# connection per thread, so reusing threads reuses connections; asyncio's
+# default executor (and ainvoke/to_thread) would get fresh threads on every
+# asyncio.run() call.
+_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
 
 def _build_meta_filter(city: Optional[str], specialty: Optional[str], insurer: Optional[str]) -> Dict[str, Any]:
     """
-    Chroma filter:
-      - exact match: {"city": {"$eq": "Jaipur"}}
-      - substring contains: {"specialties": {"$contains": "cardiology"}}
-    We stored specialties/insurers as pipe-strings like "cardiology|neurology".
+    Chroma filter (exact matches only, so Chroma can prune before ANN):
+      - city: {"city": {"$eq": "Jaipur"}}
+      - tags: {"specialty_cardiology": {"$eq": True}}
+    Ingest writes one boolean key per specialty/insurer (see lc_vector.tag_key).
+    Several conditions are combined with "$and", as Chroma requires.
     """
-    f: Dict[str, Any] = {}
+    clauses: List[Dict[str, Any]] = []
     if city and city != "All":
-        f["city"] = {"$eq": city}
+        clauses.append({"city": {"$eq": city}})
     if specialty and specialty != "All":
-        f["specialties"] = {"$contains": specialty}
+        clauses.append({tag_key("specialty", specialty): {"$eq": True}})
     if insurer and insurer != "All":
-        f["insurers"] = {"$contains": insurer}
-    return f
+        clauses.append({tag_key("insurer", insurer): {"$eq": True}})
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def _meta_matches(meta: Dict[str, Any], city: Optional[str], specialty: Optional[str],
+                  insurer: Optional[str]) -> bool:
+    """
+    Python-side equivalent of _build_meta_filter, for the BM25 path.
+    """
+    if city and city != "All" and meta.get("city") != city:
+        return False
+    if specialty and specialty != "All" and not meta.get(tag_key("specialty", specialty)):
+        return False
+    if insurer and insurer != "All" and not meta.get(tag_key("insurer", insurer)):
+        return False
+    return True
+
+async def _adense(query: str, k: int, meta_filter: Optional[Dict[str, Any]]):
+    retriever = get_retriever(k=k, meta_filter=meta_filter)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_POOL, retriever.invoke, query)
+
+async def _asparse(query: str, k: int, city: Optional[str], specialty: Optional[str],
+                   insurer: Optional[str]):
+    # rank_bm25 is pure Python/NumPy: run it off the event loop
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _POOL,
+        lambda: get_sparse_index().search(
+            query, k=k, predicate=lambda m: _meta_matches(m, city, specialty, insurer)))
+
+def _doc_key(doc) -> tuple:
+    meta = doc.metadata or {}
+    return (meta.get("hospital_name"), meta.get("address"), doc.page_content)
+
+def _rrf(result_lists: List[List], k: int) -> List:
+    """
+    Reciprocal-rank fusion: score(d) = sum 1 / (RRF_K + rank).
+    """
+    scores: Dict[tuple, float] = {}
+    docs: Dict[tuple, Any] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = _doc_key(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [docs[key] for key in ranked[:k]]
+
+async def _hybrid_search(query: str, k: int, city: Optional[str], specialty: Optional[str],
+                         insurer: Optional[str]):
+    """
+    Dense + sparse lookups run concurrently, so latency is the slower of the two.
+    A source that fails is dropped instead of failing the whole search.
+    """
+    meta_filter = _build_meta_filter(city, specialty, insurer)
+    results = await asyncio.gather(
+        _adense(query, k, meta_filter if meta_filter else None),
+        _asparse(query, k, city, specialty, insurer),
+        return_exceptions=True,
+    )
+    if isinstance(results[0], Exception):
+        raise results[0]  # dense is the primary source
+    return _rrf([r for r in results if not isinstance(r, Exception)], k)
+
+def _snippet(meta: Dict[str, Any]) -> str:
+    """
+    Human-readable details built from metadata; page_content is a keyword blob
+    meant for the embedder, not for display.
+    """
+    parts = []
+    for label, key in (("Specialties", "specialties"), ("Insurers", "insurers")):
+        values = [v for v in str(meta.get(key) or "").split("|") if v]
+        if values:
+            parts.append(f"{label}: {', '.join(values)}.")
+    return " ".join(parts)
 
 def search_hospitals(query: str, k: int = 5,
                      city: Optional[str] = None,
                      specialty: Optional[str] = None,
                      insurer: Optional[str] = None) -> List[Dict[str, Any]]:
-    meta_filter = _build_meta_filter(city, specialty, insurer)
-    retriever = get_retriever(k=k, meta_filter=meta_filter if meta_filter else None)
-    docs = _run_retriever(retriever, query)
+    docs = asyncio.run(_hybrid_search(query, k, city, specialty, insurer))
     out: List[Dict[str, Any]] = []
     for doc in docs:
         meta = doc.metadata or {}
@@ -45,6 +120,6 @@ def search_hospitals(query: str, k: int = 5,
             "rating": meta.get("rating"),
             "phone": meta.get("phone"),
             "website": meta.get("website"),
-            "snippet": (doc.page_content[:300] + ("..." if len(doc.page_content) > 300 else "")) if doc.page_content else ""
+            "snippet": _snippet(meta),
         })
     return out
@@ -0,0 +1,19 @@
+from pathlib import Path
+
+import pandas as pd
+
+CSV_PATH = Path("data/hospitals.csv")
+PARQUET_PATH = Path("data/hospitals.parquet")
+
+
+def main():
+    if not CSV_PATH.exists():
+        raise FileNotFoundError(f"CSV not found at {CSV_PATH.resolve()}")
+
+    # Keep everything as strings, same as the app's CSV reader
+    df = pd.read_csv(CSV_PATH, dtype=str)
+    df.to_parquet(PARQUET_PATH, engine="pyarrow", compression="snappy", index=False)
+    print(f"Wrote {len(df)} rows to {PARQUET_PATH}.")
+
+if __name__ == "__main__":
+    main()
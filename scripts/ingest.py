@@ -1,71 +1,76 @@
-import csv
 import sys
-from typing import Any, Dict, List
+from typing import List
 from pathlib import Path
 
+import pandas as pd
+
 # Ensure project root on path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from langchain.docstore.document import Document
-from app.services.lc_vector import build_vectorstore_from_documents, normalize_metadata
+from app.services.lc_vector import build_vectorstore_from_documents, tag_metadata
 
+CSV_COLUMNS = [
+    "hospital_name", "address", "city", "latitude", "longitude",
+    "specialties", "insurers", "rating", "phone", "website",
+]
 
-def safe_float(x, default=0.0):
-    try:
-        if x is None or x == "":
-            return default
-        return float(x)
-    except Exception:
-        return default
 
 def to_list(s: str) -> List[str]:
     if not s:
         return []
     return [itm.strip() for itm in s.split("|") if itm.strip()]
 
-def row_to_doc(row: Dict[str, str]) -> Document:
-    hosp = (row.get("hospital_name") or "").strip()
-    city = (row.get("city") or "").strip()
-    specialties = to_list(row.get("specialties", ""))
-    insurers = to_list(row.get("insurers", ""))
+def to_float(col: pd.Series, default: float = 0.0) -> pd.Series:
+    return pd.to_numeric(col, errors="coerce").fillna(default)
+
+def frame_to_docs(df: pd.DataFrame) -> List[Document]:
+    """
+    Build one Document per hospital row using column-wise string ops
+    instead of per-row Python work.
+    """
+    df = df.reindex(columns=CSV_COLUMNS).fillna("").astype(str)
+    df = df.apply(lambda col: col.str.strip())
 
+    specialties = df["specialties"].map(to_list)
+    insurers = df["insurers"].map(to_list)
+
+    # Terse keyword text: MiniLM truncates at 256 tokens and cost scales with length.
+    # Address and other display fields live in metadata only.
     text = (
-        f"{hosp} in {city} offers services in "
-        f"{', '.join(specialties) if specialties else 'general care'} "
-        f"and accepts {', '.join(insurers) if insurers else 'various insurers'}. "
-        f"Address: {row.get('address','').strip()}."
-    )
-
-    meta = {
-        "hospital_name": hosp,
-        "address": (row.get("address") or "").strip(),
-        "city": city,
-        "lat": safe_float(row.get("latitude")),
-        "lon": safe_float(row.get("longitude")),
-        "specialties": specialties,  # list → normalized later
-        "insurers": insurers,        # list → normalized later
-        "rating": safe_float(row.get("rating")),
-        "phone": (row.get("phone") or "").strip(),
-        "website": (row.get("website") or "").strip(),
-    }
-    meta = normalize_metadata(meta)
-
-    # Add tags inline to help recall
-    if specialties:
-        text += f"\nTAGS: {', '.join(specialties)}"
-
-    return Document(page_content=text, metadata=meta)
+        df["hospital_name"] + " " + df["city"] + " "
+        + specialties.str.join(" ") + " " + insurers.str.join(" ")
+    ).str.split().str.join(" ")
+
+    # Chroma metadata must be scalar: lists are stored pipe-joined
+    meta = pd.DataFrame({
+        "hospital_name": df["hospital_name"],
+        "address": df["address"],
+        "city": df["city"],
+        "lat": to_float(df["latitude"]),
+        "lon": to_float(df["longitude"]),
+        "specialties": specialties.str.join("|"),
+        "insurers": insurers.str.join("|"),
+        "rating": to_float(df["rating"]),
+        "phone": df["phone"],
+        "website": df["website"],
+    })
+
+    docs: List[Document] = []
+    for t, m, spec, ins in zip(text, meta.to_dict("records"), specialties, insurers):
+        # One boolean key per tag so filters are exact-match pre-filters
+        m.update(tag_metadata("specialty", spec))
+        m.update(tag_metadata("insurer", ins))
+        docs.append(Document(page_content=t, metadata=m))
+    return docs
 
 def main():
     csv_path = Path("data/hospitals.csv")
     if not csv_path.exists():
         raise FileNotFoundError(f"CSV not found at {csv_path.resolve()}")
 
-    docs: List[Document] = []
-    with csv_path.open(newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for _i, row in enumerate(reader, start=1):
-            docs.append(row_to_doc(row))
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False, encoding="utf-8")
+    docs = frame_to_docs(df)
 
     build_vectorstore_from_documents(docs)
     print(f"Ingested {len(docs)} hospitals into LangChain+Chroma.")